@@ -104,6 +104,18 @@ class Session:
                 self._cache_value(dataset, doc)
         return self._cache[dataset].get(id)
 
+    def get_many(self, dataset: Dataset, ids: Iterable[str]) -> List[Optional[KbEntry]]:
+        """Retrieves the specified entries from the KB by ID, in order, with a single query for any not cached."""
+        ids = list(ids)
+        if dataset is None:
+            return [None] * len(ids)
+
+        missing = [id for id in ids if id not in self._cache[dataset]]
+        if missing and self.client is not None:
+            for doc in self.client[dataset.client_db][dataset.collection].find({'_id': {'$in': missing}}):
+                self._cache_value(dataset, doc)
+        return [self._cache[dataset].get(id) for id in ids]
+
     def put(self, dataset: Dataset, entry: KbEntry, bypass_cache: bool = False):
         """Persists an entry to the KB, in the given dataset.
 
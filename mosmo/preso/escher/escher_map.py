@@ -1,8 +1,12 @@
 """Render an Escher map as SVG."""
 import math
+from bisect import bisect_left, bisect_right
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
 from dataclasses import dataclass
-from typing import Mapping, Optional, Tuple, Union
+from typing import List, Mapping, Optional, Tuple, Union
+
+import numpy as np
 
 # Default Escher styles
 CSS = """
@@ -54,10 +58,37 @@ text {
 }
 """
 
+# Approximate number of bins in the precomputed lookup table of each Scale, and the minimum between any two stops.
+LUT_SIZE = 1024
+LUT_MIN_BINS = 16
+
+
+def _f(x: float) -> str:
+    """Formats a coordinate or size to one decimal place, omitting a trailing '.0'."""
+    n = int(round(x * 10))
+    if n % 10 == 0:
+        return str(n // 10)
+    elif n < 0:
+        return f"-{-n // 10}.{-n % 10}"
+    else:
+        return f"{n // 10}.{n % 10}"
+
+
+def _attr(value: str) -> str:
+    """Escapes a string for use as a double-quoted XML attribute value."""
+    return escape(value, {'"': "&quot;"})
+
+
+def _hex_colors(rgb: np.ndarray) -> List[str]:
+    """Formats an (N, 3) array of rgb values as '#rrggbb' strings."""
+    packed = np.clip(rgb + 0.5, 0, 255).astype(np.uint32) @ np.array([0x10000, 0x100, 0x1], dtype=np.uint32)
+    return [f"#{value:06x}" for value in packed.tolist()]
+
 
 @dataclass
 class Color:
     """Supports simple arithmetic on #rrggbb hex color strings."""
+    __slots__ = ("r", "g", "b")
     r: float
     g: float
     b: float
@@ -93,10 +124,12 @@ class Scale:
 
     Color and/or size is scaled over one or more ranges, defined by "stops". Any value between two stops is styled by
     interpolating between the styles defined at those stops. Values outside the defined range are pegged at the minimum
-    or maximum as appropriate.
+    or maximum as appropriate. For speed, styles are by default precomputed at about LUT_SIZE values spanning the stops,
+    and any value is styled according to the nearest of these. Each range between two stops gets its own evenly spaced
+    bins, in proportion to its width but never fewer than LUT_MIN_BINS, so every stop is represented exactly.
     """
 
-    def __init__(self, stops: Mapping[float, Tuple[str, float]], use_abs: bool = False):
+    def __init__(self, stops: Mapping[float, Tuple[str, float]], use_abs: bool = False, use_lut: bool = True):
         """Initialize a ScaleStyler.
 
         Args:
@@ -104,45 +137,136 @@ class Scale:
                 for all stops. At least 2 stops must be provided.
             use_abs: if True, styles are applied symmetrically around zero (i.e. based on the absolute value of the
                 data). Default is False.
+            use_lut: if True, values are styled using a precomputed lookup table. If False, each value is interpolated
+                exactly. Default is True.
 
-        Returns:
-            A (color, style) tuple, where either color or style may be None.
         """
         self.stops = sorted(
-            ((value, Color.from_hex(color), size) for value, (color, size) in stops.items()),
+            ((value, Color.from_hex(color) if color else None, size) for value, (color, size) in stops.items()),
             key=lambda x: x[0]
         )
         self.use_abs = use_abs
-
-    def style(self, value: float) -> Tuple[Color, float]:
-        """Maps a value to an interpolated color and/or size."""
+        self.use_lut = use_lut
+
+        # Whether colors and sizes are styled is fixed by the stops, so decide it once.
+        self._has_color = all(color is not None for _, color, _ in self.stops)
+        self._has_size = all(size is not None for _, _, size in self.stops)
+
+        # Stop values and styles as parallel arrays, for vectorized interpolation, plus a list for binary search.
+        self._thresholds = [stop[0] for stop in self.stops]
+        self._stop_v = np.array(self._thresholds, dtype=float)
+        self._stop_rgb = np.array(
+            [(color.r, color.g, color.b) if self._has_color else (0., 0., 0.) for _, color, _ in self.stops],
+            dtype=float)
+        self._stop_size = np.array([size if self._has_size else 0. for _, _, size in self.stops], dtype=float)
+        # The same styles as flat tuples of python floats, for interpolating single values without numpy overhead.
+        self._stop_styles = [(*rgb, size) for rgb, size in zip(self._stop_rgb.tolist(), self._stop_size.tolist())]
+
+        # Precompute a dense lookup table over the range of stops, so styling a value is just an index operation.
+        # Bins are evenly spaced within each range between stops, starting exactly at the lower stop.
+        self._vmin = self._thresholds[0]
+        self._vmax = self._thresholds[-1]
+        widths = np.diff(self._stop_v)
+        bins = np.maximum(LUT_MIN_BINS, np.rint(LUT_SIZE * widths / (self._vmax - self._vmin))).astype(int)
+        self._lut_offsets = np.concatenate([[0], np.cumsum(bins)[:-1]])
+        self._lut_scales = bins / widths
+        grid = np.concatenate(
+            [lb + np.arange(n) * (width / n) for lb, width, n in zip(self._stop_v, widths, bins)] + [[self._vmax]])
+        self._lut_len = len(grid)
+        self._lut_rgb, self._lut_size = self._interpolate_many(grid)
+        # There are only so many distinct styles, so format them up front as well.
+        self._hex_lut = _hex_colors(self._lut_rgb) if self._has_color else [None] * self._lut_len
+        self._size_lut = self._lut_size.tolist() if self._has_size else [None] * self._lut_len
+        self._lut_offset_list = self._lut_offsets.tolist()
+        self._lut_scale_list = self._lut_scales.tolist()
+
+    def _interpolate_many(self, values: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Computes exact interpolated colors, as an (N, 3) array of rgb values, and sizes for an array of values."""
+        if self._has_color:
+            rgb = np.stack([np.interp(values, self._stop_v, self._stop_rgb[:, c]) for c in range(3)], axis=-1)
+        else:
+            rgb = None
+        if self._has_size:
+            sizes = np.interp(values, self._stop_v, self._stop_size)
+        else:
+            sizes = None
+        return rgb, sizes
+
+    def _interpolate(self, value: float) -> Tuple[Optional[str], Optional[float]]:
+        """Computes the exact interpolated color and/or size for a value within the range of stops."""
+        # Bracket the value
+        ub = bisect_left(self._thresholds, value)
+        if ub == 0:
+            ub = 1
+        lb = ub - 1
+
+        lb_v = self._thresholds[lb]
+        p = (value - lb_v) / (self._thresholds[ub] - lb_v)
+        lb_r, lb_g, lb_b, lb_size = self._stop_styles[lb]
+        ub_r, ub_g, ub_b, ub_size = self._stop_styles[ub]
+        r = lb_r + p * (ub_r - lb_r)
+        g = lb_g + p * (ub_g - lb_g)
+        b = lb_b + p * (ub_b - lb_b)
+        size = lb_size + p * (ub_size - lb_size)
+
+        color = f"#{int(r + 0.5):02x}{int(g + 0.5):02x}{int(b + 0.5):02x}" if self._has_color else None
+        return color, size if self._has_size else None
+
+    def _lut_index(self, values):
+        """Maps an array of values to the nearest bins of the lookup table, pegged at either end."""
+        k = np.clip(np.searchsorted(self._stop_v, values, side="right") - 1, 0, len(self._thresholds) - 2)
+        i = self._lut_offsets[k] + np.floor((values - self._stop_v[k]) * self._lut_scales[k] + 0.5)
+        return np.clip(i, 0, self._lut_len - 1).astype(int)
+
+    def style(self, value: float) -> Tuple[Optional[str], Optional[float]]:
+        """Maps a value to an interpolated '#rrggbb' color and/or size."""
         if self.use_abs:
             value = abs(value)
 
-        # Range check
-        if value < self.stops[0][0]:
-            return self.stops[0][1], self.stops[0][2]
-        elif value > self.stops[-1][0]:
-            return self.stops[-1][1], self.stops[-1][2]
-
-        # In range: bracket the value
-        lb = self.stops[0]
-        for ub in self.stops[1:]:
-            if ub[0] >= value:
-                break
-            lb = ub
-
-        p = (value - lb[0]) / (ub[0] - lb[0])
-        if lb[1] and ub[1]:
-            color = p * ub[1] + (1 - p) * lb[1]
-        else:
-            color = None
-        if lb[2] and ub[2]:
-            size = p * ub[2] + (1 - p) * lb[2]
+        if not self.use_lut:
+            # Range check
+            return self._interpolate(min(max(value, self._vmin), self._vmax))
+
+        # Bracket the value, then find the nearest bin within its range.
+        k = bisect_right(self._thresholds, value) - 1
+        if k < 0:
+            i = 0
+        elif k >= len(self._thresholds) - 1:
+            i = self._lut_len - 1
         else:
-            size = None
+            i = self._lut_offset_list[k] + int((value - self._thresholds[k]) * self._lut_scale_list[k] + 0.5)
 
-        return color, size
+        return self._hex_lut[i], self._size_lut[i]
+
+    def style_many(self, values: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Maps an array of values to interpolated colors, as an (N, 3) array of rgb values, and sizes."""
+        values = np.asarray(values, dtype=float)
+        if self.use_abs:
+            values = np.abs(values)
+
+        if not self.use_lut:
+            return self._interpolate_many(values)
+
+        i = self._lut_index(values)
+        rgb = self._lut_rgb[i] if self._has_color else None
+        sizes = self._lut_size[i] if self._has_size else None
+        return rgb, sizes
+
+    def styles(self, values: np.ndarray) -> List[Tuple[Optional[str], Optional[float]]]:
+        """Maps an array of values to a list of interpolated ('#rrggbb' color, size) tuples."""
+        values = np.asarray(values, dtype=float)
+        if self.use_abs:
+            values = np.abs(values)
+
+        if not self.use_lut:
+            rgb, sizes = self._interpolate_many(values)
+            colors = _hex_colors(rgb) if rgb is not None else [None] * len(values)
+            sizes = sizes.tolist() if sizes is not None else [None] * len(values)
+            return list(zip(colors, sizes))
+
+        hex_lut = self._hex_lut
+        size_lut = self._size_lut
+        return [(hex_lut[i], size_lut[i]) for i in self._lut_index(values).tolist()]
 
 
 def GaBuGeRd(minval=0, mid1=0.01, mid2=20, maxval=100):
@@ -186,9 +310,13 @@ class EscherMap:
         diagram2 = EscherMap(json.loads(<mapfile>)), reaction_scale=GaBuRd(midval=1.5, maxval=10))
         IPython.display.SVG(diagram2.draw(width="800px", reaction_data=<data>))
 
-    For greater control, use build(), which returns a standard SVG document as an ET.Element. Users with web development
-    or CSS experience can manipulate this to fine-tune its appearance. This can be rendered to a string, or saved to a
-    file to be loaded into a drawing application such as Inkscape or Illustrator.
+    draw() writes SVG text directly, without building an intermediate document tree. For greater control, use build(),
+    which returns a standard SVG document as an ET.Element. Users with web development or CSS experience can manipulate
+    this to fine-tune its appearance. This can be rendered to a string, or saved to a file to be loaded into a drawing
+    application such as Inkscape or Illustrator.
+
+    To declutter large maps, set hide_secondary_labels to omit labels for secondary (i.e. cofactor) metabolite nodes,
+    and for any reactions without a value when drawing reaction data.
     """
 
     def __init__(self,
@@ -196,11 +324,13 @@ class EscherMap:
                  width: Optional[Union[str, float, int]] = None,
                  height: Optional[Union[str, float, int]] = None,
                  reaction_scale: Optional[Scale] = None,
-                 metabolite_scale: Optional[Scale] = None):
+                 metabolite_scale: Optional[Scale] = None,
+                 hide_secondary_labels: bool = False):
         self.width = width
         self.height = height
         self.reaction_scale = reaction_scale
         self.metabolite_scale = metabolite_scale
+        self.hide_secondary_labels = hide_secondary_labels
 
         self.origin = (map_json[1]["canvas"]["x"], map_json[1]["canvas"]["y"])
         self.size = (map_json[1]["canvas"]["width"], map_json[1]["canvas"]["height"])
@@ -220,6 +350,15 @@ class EscherMap:
         for reaction_id, reaction_json in map_json[1]["reactions"].items():
             self.reactions.append(MapReaction(self, reaction_json, all_nodes))
 
+        # Styles are the same for every rendering. The <svg> tag and background canvas are written on each call, since
+        # dimensions, origin and size may be changed at any time.
+        self._header = f'<defs><style type="text/css">{escape(CSS)}</style></defs><g id="eschermap">'
+        self._suffix = '</g></svg>'
+
+        # Element ids in drawing order, for looking up and styling data values in bulk.
+        self._reaction_ids = [reaction.reaction_id for reaction in self.reactions]
+        self._metabolite_ids = [metabolite.metabolite_id for metabolite in self.metabolites]
+
     def build(
             self,
             metabolite_data: Optional[Mapping[str, float]] = None,
@@ -237,7 +376,7 @@ class EscherMap:
         svg = ET.Element("svg",
                          {"width": str(self.width),
                           "height": str(self.height),
-                          "viewBox": f"{self.origin[0]:.1f} {self.origin[1]:.1f} {self.size[0]:.1f} {self.size[1]:.1f}"}
+                          "viewBox": f"{_f(self.origin[0])} {_f(self.origin[1])} {_f(self.size[0])} {_f(self.size[1])}"}
                          )
         defs = ET.Element("defs")
         defs.append(ET.Element("style", {"type": "text/css"}))
@@ -249,10 +388,10 @@ class EscherMap:
         maproot.append(
             ET.Element("rect",
                        {"id": "canvas",
-                        "x": f"{self.origin[0]:.1f}",
-                        "y": f"{self.origin[1]:.1f}",
-                        "width": f"{self.size[0]:.1f}",
-                        "height": f"{self.size[1]:.1f}"}
+                        "x": _f(self.origin[0]),
+                        "y": _f(self.origin[1]),
+                        "width": _f(self.size[0]),
+                        "height": _f(self.size[1])}
                        ))
 
         # Reactions with segments and labels, possibly styled according to data values
@@ -260,10 +399,11 @@ class EscherMap:
         if reaction_data:
             reactions.set("class", "data")
 
+        hide_labels = self.hide_secondary_labels and bool(reaction_data)
         for reaction in self.reactions:
             value = reaction_data.get(reaction.reaction_id)
             direction = reaction_direction.get(reaction.reaction_id)
-            reactions.append(reaction.build(value, direction))
+            reactions.append(reaction.build(value, direction, show_label=not hide_labels or value is not None))
         maproot.append(reactions)
 
         # Metabolite nodes, possibly styled according to data values
@@ -284,15 +424,74 @@ class EscherMap:
              reaction_data: Optional[Mapping[str, float]] = None,
              reaction_direction: Optional[Mapping[str, float]] = None) -> str:
         """Renders a diagram with optional overlays of metabolite and/or reaction data, as an SVG string."""
-        svg = self.build(
+        return self.to_svg_string(
             metabolite_data=metabolite_data,
             reaction_data=reaction_data,
             reaction_direction=reaction_direction)
-        return ET.tostring(svg, encoding="unicode")
+
+    def to_svg_string(
+            self,
+            metabolite_data: Optional[Mapping[str, float]] = None,
+            reaction_data: Optional[Mapping[str, float]] = None,
+            reaction_direction: Optional[Mapping[str, float]] = None) -> str:
+        """Renders the same SVG document as build(), but writes it directly as a string."""
+        if reaction_data is None:
+            reaction_data = {}
+        if reaction_direction is None:
+            reaction_direction = reaction_data
+        if metabolite_data is None:
+            metabolite_data = {}
+
+        x, y = _f(self.origin[0]), _f(self.origin[1])
+        width, height = _f(self.size[0]), _f(self.size[1])
+        parts = [
+            f'<svg width="{_attr(str(self.width))}" height="{_attr(str(self.height))}"'
+            f' viewBox="{x} {y} {width} {height}">',
+            self._header,
+            f'<rect id="canvas" x="{x}" y="{y}" width="{width}" height="{height}"/>',
+        ]
+
+        # Reactions with segments and labels, possibly styled according to data values
+        parts.append('<g id="reactions" class="data">' if reaction_data else '<g id="reactions">')
+        styles = self._styles(self.reaction_scale, self._reaction_ids, reaction_data)
+        hide_labels = self.hide_secondary_labels and bool(reaction_data)
+        for reaction, style in zip(self.reactions, styles):
+            direction = reaction_direction.get(reaction.reaction_id)
+            show_label = not hide_labels or reaction_data.get(reaction.reaction_id) is not None
+            reaction.write(parts, style, direction, show_label=show_label)
+        parts.append('</g>')
+
+        # Metabolite nodes, possibly styled according to data values
+        parts.append('<g id="metabolites" class="data">' if metabolite_data else '<g id="metabolites">')
+        styles = self._styles(self.metabolite_scale, self._metabolite_ids, metabolite_data)
+        for metabolite, style in zip(self.metabolites, styles):
+            metabolite.write(parts, style)
+        parts.append('</g>')
+
+        parts.append(self._suffix)
+        return "".join(parts)
+
+    @staticmethod
+    def _styles(scale: Optional[Scale],
+                ids: List[str],
+                data: Mapping[str, float]) -> List[Optional[Tuple[str, float]]]:
+        """Styles the data values for all ids at once, as (color, size), or None where there is no value to style."""
+        styles = [None] * len(ids)
+        if scale is None or not data:
+            return styles
+
+        # Missing values (or None) become NaN.
+        values = np.array([data.get(id_) for id_ in ids], dtype=float)
+        present = np.flatnonzero(~np.isnan(values))
+        if len(present):
+            for i, style in zip(present.tolist(), scale.styles(values[present])):
+                styles[i] = style
+        return styles
 
 
 class MapNode:
     """Any node that can serve as an endpoint for a segment."""
+    __slots__ = ("parent", "center")
 
     def __init__(self, parent: EscherMap, node_json):
         self.parent = parent
@@ -301,6 +500,7 @@ class MapNode:
 
 class MapMetabolite(MapNode):
     """A node that designates a metabolite."""
+    __slots__ = ("metabolite_id", "primary", "label_pos")
 
     def __init__(self, parent: EscherMap, node_json):
         super().__init__(parent, node_json)
@@ -314,25 +514,45 @@ class MapMetabolite(MapNode):
         else:
             return 12.
 
+    def show_label(self) -> bool:
+        return self.primary or not self.parent.hide_secondary_labels
+
     def build(self, value=None) -> ET.Element:
         circle = ET.Element("circle",
-                            {"cx": f"{self.center[0]:.1f}", "cy": f"{self.center[1]:.1f}", "r": f"{self.size():.1f}"})
+                            {"cx": _f(self.center[0]), "cy": _f(self.center[1]), "r": _f(self.size())})
         if value is not None and self.parent.metabolite_scale is not None:
             color, size = self.parent.metabolite_scale.style(value)
-            circle.set("r", f"{size:.1f}")
-            circle.set("style", f"fill: {str(color)};")
-
-        label = ET.Element("text", {"x": f"{self.label_pos[0]:.1f}", "y": f"{self.label_pos[1]:.1f}"})
-        label.text = self.metabolite_id
+            circle.set("r", _f(size))
+            circle.set("style", f"fill: {color};")
 
         group = ET.Element("g", {"name": self.metabolite_id})
         group.append(circle)
-        group.append(label)
+        if self.show_label():
+            label = ET.Element("text", {"x": _f(self.label_pos[0]), "y": _f(self.label_pos[1])})
+            label.text = self.metabolite_id
+            group.append(label)
         return group
 
+    def write(self, parts: List[str], style: Optional[Tuple[str, float]] = None):
+        """Appends the SVG text of build() to parts, given the (color, size) styling the node's data value, if any."""
+        size = self.size()
+        style_attr = ""
+        if style is not None:
+            color, size = style
+            style_attr = f' style="fill: {color};"'
+
+        parts.append(f'<g name="{_attr(self.metabolite_id)}">'
+                     f'<circle cx="{_f(self.center[0])}" cy="{_f(self.center[1])}" r="{_f(size)}"{style_attr}/>')
+        if self.show_label():
+            parts.append(
+                f'<text x="{_f(self.label_pos[0])}" y="{_f(self.label_pos[1])}">{escape(self.metabolite_id)}</text>')
+        parts.append('</g>')
+
 
 class MapReaction:
     """A collection of segments associating metabolites with a reaction."""
+    __slots__ = ("parent", "reaction_id", "stoich", "reversible", "label_pos", "segments", "_static_arrows",
+                 "_static_d")
 
     def __init__(self, parent: EscherMap, reaction_json, all_nodes: Mapping[str, MapNode]):
         self.parent = parent
@@ -344,28 +564,71 @@ class MapReaction:
         self.segments = [MapSegment(self, segment_json, all_nodes) for segment_json in
                          reaction_json["segments"].values()]
 
-    def build(self, value=None, direction=None) -> ET.Element:
+        # Without direction data, arrows and therefore the path geometry are fixed.
+        self._static_arrows = [segment.has_arrow(None) for segment in self.segments]
+        self._static_d = self._path_d(self._static_arrows)
+
+    def _path_d(self, arrows: List[bool]) -> str:
+        """Path data for all segments combined, given whether each segment ends in an arrowhead."""
+        return " ".join(segment.path_d(has_arrow) for segment, has_arrow in zip(self.segments, arrows))
+
+    def path(self, direction=None) -> Tuple[List[bool], str]:
+        """Whether each segment ends in an arrowhead, and the combined path data for all segments."""
+        if direction is None:
+            return self._static_arrows, self._static_d
+        arrows = [segment.has_arrow(direction) for segment in self.segments]
+        return arrows, self._path_d(arrows)
+
+    def build(self, value=None, direction=None, show_label: bool = True) -> ET.Element:
         group = ET.Element("g", {"name": self.reaction_id})
         if value is not None and self.parent.reaction_scale is not None:
             color, size = self.parent.reaction_scale.style(value)
-            # group.set("stroke", str(color))
-            # group.set("stroke-width", f"{size:.1f}")
-            group.set("style", f"stroke: {str(color)}; stroke-width: {size:.1f};")
+            # group.set("stroke", color)
+            # group.set("stroke-width", _f(size))
+            group.set("style", f"stroke: {color}; stroke-width: {_f(size)};")
+
+        # All segments share the reaction's style, so they can be drawn as a single path.
+        arrows, d = self.path(direction)
+        group.append(ET.Element("path", {"d": d}))
+        for segment, has_arrow in zip(self.segments, arrows):
+            group.extend(segment.decorations(value, has_arrow))
+
+        if show_label:
+            label = ET.Element("text", {"x": _f(self.label_pos[0]), "y": _f(self.label_pos[1])})
+            label.text = self.reaction_id
+            group.append(label)
+        return group
 
-        for segment in self.segments:
-            group.append(segment.build(value, direction))
+    def write(self, parts: List[str], style: Optional[Tuple[str, float]] = None, direction=None,
+              show_label: bool = True):
+        """Appends the SVG text of build() to parts, given the (color, size) styling the reaction's value, if any."""
+        name = _attr(self.reaction_id)
+        if style is not None:
+            color, size = style
+            parts.append(f'<g name="{name}" style="stroke: {color}; stroke-width: {_f(size)};">')
+        else:
+            parts.append(f'<g name="{name}">')
 
-        label = ET.Element("text", {"x": f"{self.label_pos[0]:.1f}", "y": f"{self.label_pos[1]:.1f}"})
-        label.text = self.reaction_id
-        group.append(label)
-        return group
+        arrows, d = self.path(direction)
+        parts.append(f'<path d="{d}"/>')
+        for segment, has_arrow in zip(self.segments, arrows):
+            segment.write_decorations(parts, style, has_arrow)
+
+        if show_label:
+            parts.append(
+                f'<text x="{_f(self.label_pos[0])}" y="{_f(self.label_pos[1])}">{escape(self.reaction_id)}</text>')
+        parts.append('</g>')
 
 
 class MapSegment:
     """A single connection tying a metabolite to a reaction, or nodes within a reaction."""
+    __slots__ = ("reaction", "from_node", "to_node", "b1", "b2", "metabolite_id", "count", "_approach", "_dx", "_dy",
+                 "_l", "_angle", "_dy_over_l_24", "_dx_over_l_24", "_end_arrow", "_end_no_arrow", "_d_arrow",
+                 "_d_no_arrow")
 
     # This arrowhead is sized for a stroke-width of 10.
-    ARROWHEAD = ET.Element("path", {"d": "M 0 -10 L 13 0 L 0 10 Z", "transform": "translate(-3)"})
+    ARROWHEAD = ET.Element("path", {"d": "M0-10L13 0L0 10Z", "transform": "translate(-3)"})
+    ARROWHEAD_SVG = '<path d="M0-10L13 0L0 10Z" transform="translate(-3)"/>'
 
     def __init__(self, reaction: MapReaction, segment_json, all_nodes: Mapping[str, MapNode]):
         self.reaction = reaction
@@ -387,73 +650,115 @@ class MapSegment:
             self.metabolite_id = None
             self.count = None
 
+        # Endpoints never move, so precompute the geometry, and path data, for drawing with or without an arrowhead.
+        if self.metabolite_id is None:
+            self._approach = None
+            self._dx = self._dy = self._l = None
+            self._angle = self._dy_over_l_24 = self._dx_over_l_24 = None
+            self._end_arrow = self._end_no_arrow = self.to_node.center
+        else:
+            end = self.to_node.center
+            self._approach = self.b2 or self.from_node.center  # tolerate missing b2
+            self._dx = end[0] - self._approach[0]
+            self._dy = end[1] - self._approach[1]
+            self._l = math.hypot(self._dx, self._dy)
+            # Arrowheads align with the approach, and stoichiometry labels are offset perpendicular to it.
+            self._angle = math.atan2(self._dy, self._dx) * 180 / math.pi
+            self._dy_over_l_24 = self._dy / self._l * 24
+            self._dx_over_l_24 = self._dx / self._l * 24
+            self._end_arrow = self._padded_end(True)
+            self._end_no_arrow = self._padded_end(False)
+        self._d_arrow = self._path_d(self._end_arrow)
+        self._d_no_arrow = self._path_d(self._end_no_arrow)
+
     def arrowhead(self, x: float, y: float, angle: float, value: float) -> ET.Element:
         """Manually define an arrowhead glyph at the specified position and angle."""
         arrowhead = ET.Element("g",
                                {"class": "arrowhead",
-                                "transform": f"translate({x:.1f}, {y:.1f}) rotate({angle:.0f})"})
+                                "transform": f"translate({_f(x)},{_f(y)}) rotate({angle:.0f})"})
         arrowhead.append(MapSegment.ARROWHEAD)
         if value is not None and self.reaction.parent.reaction_scale is not None:
             color, size = self.reaction.parent.reaction_scale.style(value)
-            arrowhead.set("transform", arrowhead.get("transform") + f" scale({size / 10:.1f})")
+            arrowhead.set("transform", arrowhead.get("transform") + f" scale({_f(size / 10)})")
             # Note setting the style attribute takes precedence over CSS, where setting fill directly does not.
-            arrowhead.set("style", f"fill: {str(color)}")
+            arrowhead.set("style", f"fill: {color}")
         return arrowhead
 
-    def build(self, value: float, direction: float) -> ET.Element:
-        start = self.from_node.center
-        end = self.to_node.center
-
+    def has_arrow(self, direction: Optional[float]) -> bool:
+        """Determines whether this segment ends in an arrowhead, given the direction of the reaction if known."""
         if self.metabolite_id is None:
-            # Just a connector between "midmarker" and "multimarker". Uae a <path> so css finds it.
-            return ET.Element("path", {"d": f"M {start[0]:.1f} {start[1]:.1f} L {end[0]:.1f} {end[1]:.1f}"})
-        # else...
-
-        has_arrow = False
-        if direction is not None and self.count * direction > 0:
-            has_arrow = True
-        elif direction is None and (self.reaction.reversible or self.count > 0):
-            has_arrow = True
-
-        # Adjust the endpoint to approach the metabolite node but stop at a padded distance from it.
-        approach = self.b2 or start  # tolerate missing b2
-        dx = end[0] - approach[0]
-        dy = end[1] - approach[1]
-        l = math.sqrt(dx * dx + dy * dy)
+            return False
+        elif direction is not None:
+            return self.count * direction > 0
+        else:
+            return self.reaction.reversible or self.count > 0
 
+    def _padded_end(self, has_arrow: bool) -> Tuple[float, float]:
+        """Adjusts the endpoint to approach the metabolite node but stop at a padded distance from it."""
         # Some fine-tuning to try to match escher's existing behavior.
         padding = 20. if has_arrow else 10.
         minlen = 5.
-        _l = l - self.to_node.size() - padding
+        _l = self._l - self.to_node.size() - padding
         if _l < minlen:
-            _l = l - self.to_node.size()
-        ratio = _l / l
-        end = (approach[0] + dx * ratio, approach[1] + dy * ratio)
-
-        if self.b1 and self.b2:
-            arc = ET.Element("path", {
-                "d": f"M {start[0]:.1f} {start[1]:.1f} C {self.b1[0]:.1f} {self.b1[1]:.1f}" +
-                     f" {self.b2[0]:.1f} {self.b2[1]:.1f} {end[0]:.1f} {end[1]:.1f}"})
+            _l = self._l - self.to_node.size()
+        ratio = _l / self._l
+        return self._approach[0] + self._dx * ratio, self._approach[1] + self._dy * ratio
+
+    def _path_d(self, end: Tuple[float, float]) -> str:
+        """Formats path data from the start node to the given endpoint."""
+        start = self.from_node.center
+        if self.metabolite_id is not None and self.b1 and self.b2:
+            return (f"M{_f(start[0])} {_f(start[1])}C{_f(self.b1[0])} {_f(self.b1[1])}" +
+                    f" {_f(self.b2[0])} {_f(self.b2[1])} {_f(end[0])} {_f(end[1])}")
         else:
-            arc = ET.Element("path", {"d": f"M {start[0]:.1f} {start[1]:.1f} L {end[0]:.1f} {end[1]:.1f}"})
+            # Connectors between "midmarker" and "multimarker" are always straight.
+            return f"M{_f(start[0])} {_f(start[1])}L{_f(end[0])} {_f(end[1])}"
+
+    def endpoint(self, has_arrow: bool) -> Tuple[float, float]:
+        """Where the drawn segment ends: short of a metabolite node, leaving room for an arrowhead if needed."""
+        return self._end_arrow if has_arrow else self._end_no_arrow
+
+    def path_d(self, has_arrow: bool) -> str:
+        """The path data (i.e. the 'd' attribute of an SVG <path>) for this segment."""
+        return self._d_arrow if has_arrow else self._d_no_arrow
+
+    def decorations(self, value: Optional[float], has_arrow: bool) -> List[ET.Element]:
+        """Any arrowhead and stoichiometry label to be drawn along with this segment."""
+        if self.metabolite_id is None:
+            return []
 
+        decorations = []
+        end = self.endpoint(has_arrow)
         if has_arrow:
             # Previous attempts with either <marker> or <symbol> failed to behave as needed. Just make it explicit.
-            _arc = ET.Element("g")
-            _arc.append(arc)
-            _arc.append(self.arrowhead(end[0], end[1], math.atan2(dy, dx) * 180 / math.pi, value))
-            arc = _arc
+            decorations.append(self.arrowhead(end[0], end[1], self._angle, value))
 
         count = abs(self.count)
-        if count == 1:
-            return arc
-        else:
-            group = ET.Element("g")
-            group.append(arc)
-
-            label_x = end[0] + dy / l * 24
-            label_y = end[1] - dx / l * 24
-            stoich_label = ET.Element("text", {"class": "stoich", "x": f"{label_x:.1f}", "y": f"{label_y:.1f}"})
+        if count != 1:
+            label_x = end[0] + self._dy_over_l_24
+            label_y = end[1] - self._dx_over_l_24
+            stoich_label = ET.Element("text", {"class": "stoich", "x": _f(label_x), "y": _f(label_y)})
             stoich_label.text = str(count)
-            group.append(stoich_label)
-            return group
+            decorations.append(stoich_label)
+        return decorations
+
+    def write_decorations(self, parts: List[str], style: Optional[Tuple[str, float]], has_arrow: bool):
+        """Appends the SVG text of decorations() to parts, given the (color, size) styling the reaction, if any."""
+        if self.metabolite_id is None:
+            return
+
+        end = self.endpoint(has_arrow)
+        if has_arrow:
+            transform = f"translate({_f(end[0])},{_f(end[1])}) rotate({self._angle:.0f})"
+            style_attr = ""
+            if style is not None:
+                color, size = style
+                transform += f" scale({_f(size / 10)})"
+                style_attr = f' style="fill: {color}"'
+            parts.append(f'<g class="arrowhead" transform="{transform}"{style_attr}>{MapSegment.ARROWHEAD_SVG}</g>')
+
+        count = abs(self.count)
+        if count != 1:
+            label_x = end[0] + self._dy_over_l_24
+            label_y = end[1] - self._dx_over_l_24
+            parts.append(f'<text class="stoich" x="{_f(label_x)}" y="{_f(label_y)}">{count}</text>')
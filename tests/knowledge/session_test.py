@@ -47,6 +47,31 @@ class TestSession:
         assert len(session._cache[TEST]) == 2
         assert session.get(TEST, "obj1") is obj1
 
+    def test_GetMany(self):
+        """The KB retrieves multiple entries at once, in order, with None for any not found."""
+        session = self.mem_session()
+        obj1 = KbEntry("obj1", name="Test object 1")
+        obj2 = KbEntry("obj2", name="Test object 2")
+        session.put(TEST, obj1)
+        session.put(TEST, obj2)
+
+        assert session.get_many(TEST, ["obj2", "nope", "obj1"]) == [obj2, None, obj1]
+
+    def test_GetManyFromDb(self):
+        """The KB retrieves multiple uncached entries from the underlying db."""
+        session = self.db_session()
+        if not session:
+            warn("No available mongodb connection -- skipping test.")
+            return
+
+        session.put(TEST, KbEntry("obj1", name="Test object 1"), bypass_cache=True)
+        session.put(TEST, KbEntry("obj2", name="Test object 2"), bypass_cache=True)
+        assert len(session._cache[TEST]) == 0
+
+        found = session.get_many(TEST, ["obj2", "nope", "obj1"])
+        assert [entry.id if entry else None for entry in found] == ["obj2", None, "obj1"]
+        assert session.get(TEST, "obj1") is found[2]
+
     def test_DerefObj(self):
         """The KB can dereference a DbXref."""
         session = self.mem_session()
@@ -0,0 +1,153 @@
+"""Tests for mosmo.preso.escher.escher_map."""
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from mosmo.preso.escher import pw
+from mosmo.preso.escher.escher_map import _f, EscherMap, GaBu, GaBuGeRd, GaBuRd, GeGaRd, RdYlBu, Scale, WhYlRd
+
+PRESETS = [GaBuGeRd, GaBuRd, RdYlBu, GeGaRd, WhYlRd, GaBu]
+
+
+class TestFormat:
+    @pytest.mark.parametrize("x, expected", [
+        (12.34, "12.3"),
+        (-12.34, "-12.3"),
+        (12.0, "12"),
+        (11.96, "12"),
+        (-11.96, "-12"),
+        (0, "0"),
+        (0.049, "0"),
+        (0.051, "0.1"),
+        (-0.049, "0"),
+        (-0.051, "-0.1"),
+    ])
+    def test_Format(self, x, expected):
+        """Values are rounded to one decimal place, and whole numbers are written without a trailing '.0'."""
+        assert _f(x) == expected
+        assert _f(np.float64(x)) == expected
+
+
+class TestScale:
+    @pytest.mark.parametrize("preset", PRESETS)
+    @pytest.mark.parametrize("use_lut", [True, False])
+    def test_StopsAreExact(self, preset, use_lut):
+        """A value at any stop is styled with exactly that stop's color and size."""
+        scale = preset()
+        scale.use_lut = use_lut
+        for value, color, size in scale.stops:
+            assert scale.style(value) == (str(color), size)
+
+    def test_NarrowStops(self):
+        """Stops much closer together than the overall range are still honored by the lookup table."""
+        scale = Scale({0: ("#000000", 1), 1e-6: ("#ffffff", 2), 1e6: ("#000000", 3)})
+        assert scale.style(1e-6) == ("#ffffff", 2)
+        assert scale.style(0.5e-6) == ("#808080", 1.5)
+
+    @pytest.mark.parametrize("preset", PRESETS)
+    @pytest.mark.parametrize("use_lut", [True, False])
+    def test_StylesMatchStyle(self, preset, use_lut):
+        """Styling values in bulk gives the same results as styling them one at a time."""
+        scale = preset()
+        scale.use_lut = use_lut
+        values = np.random.default_rng(42).uniform(-150, 150, 1000)
+        expected = [scale.style(value) for value in values.tolist()]
+
+        styles = scale.styles(values)
+        assert [color for color, _ in styles] == [color for color, _ in expected]
+        np.testing.assert_allclose([size for _, size in styles], [size for _, size in expected])
+
+        rgb, sizes = scale.style_many(values)
+        assert ["#%02x%02x%02x" % tuple(int(c + 0.5) for c in row) for row in rgb.tolist()] == [
+            color for color, _ in expected]
+        np.testing.assert_allclose(sizes, [size for _, size in expected])
+
+
+@pytest.fixture(scope="module")
+def map_json():
+    with open(os.path.join(os.path.dirname(pw.__file__), "glycolysis_ppp_ed.json")) as f:
+        return json.load(f)
+
+
+def data_cases(map_json):
+    """Combinations of reaction and metabolite data to render, some with values missing."""
+    rng = np.random.default_rng(42)
+    reaction_ids = [reaction["bigg_id"] for reaction in map_json[1]["reactions"].values()]
+    metabolite_ids = [node["bigg_id"] for node in map_json[1]["nodes"].values() if node["node_type"] == "metabolite"]
+    reaction_data = {id_: rng.uniform(-12, 12) for id_ in reaction_ids if rng.random() < 0.8}
+    metabolite_data = {id_: rng.uniform(0, 120) for id_ in metabolite_ids if rng.random() < 0.8}
+    reaction_direction = {id_: rng.choice([-1, 1]) for id_ in reaction_ids}
+    return [
+        {},
+        {"reaction_data": reaction_data},
+        {"metabolite_data": metabolite_data},
+        {"reaction_data": reaction_data, "metabolite_data": metabolite_data},
+        {"reaction_data": {id_: 1 for id_ in reaction_ids}, "reaction_direction": reaction_direction},
+    ]
+
+
+class TestEscherMap:
+    @pytest.mark.parametrize("hide_secondary_labels", [False, True])
+    @pytest.mark.parametrize("use_lut", [True, False])
+    def test_DrawMatchesBuild(self, map_json, hide_secondary_labels, use_lut):
+        """draw() writes exactly the document that build() constructs."""
+        reaction_scale = GaBuRd(midval=1.5, maxval=10)
+        metabolite_scale = WhYlRd()
+        reaction_scale.use_lut = use_lut
+        metabolite_scale.use_lut = use_lut
+        diagram = EscherMap(map_json, width="20cm", reaction_scale=reaction_scale, metabolite_scale=metabolite_scale,
+                            hide_secondary_labels=hide_secondary_labels)
+        for args in data_cases(map_json):
+            expected = ET.tostring(diagram.build(**args))
+            assert ET.tostring(ET.fromstring(diagram.draw(**args))) == expected
+
+    def test_ResizeAfterInit(self, map_json):
+        """Changes to dimensions, origin and size after construction are reflected in the drawing."""
+        diagram = EscherMap(map_json, width="20cm")
+        diagram.draw()
+        diagram.width = "800px"
+        diagram.height = "600px"
+        diagram.origin = (-10, 20.5)
+        diagram.size = (1000, 750.5)
+        svg = ET.fromstring(diagram.draw())
+        assert (svg.get("width"), svg.get("height")) == ("800px", "600px")
+        assert svg.get("viewBox") == "-10 20.5 1000 750.5"
+        canvas = svg.find("g[@id='eschermap']/rect[@id='canvas']")
+        assert [canvas.get(attr) for attr in ("x", "y", "width", "height")] == ["-10", "20.5", "1000", "750.5"]
+        assert ET.tostring(svg) == ET.tostring(diagram.build())
+
+    @pytest.mark.parametrize("render", ["build", "draw"])
+    def test_HideSecondaryLabels(self, map_json, render):
+        """Secondary metabolite labels are omitted, as are labels of reactions without a value when drawing data."""
+        def labels(hide_secondary_labels, **args):
+            diagram = EscherMap(map_json, reaction_scale=GaBuRd(), hide_secondary_labels=hide_secondary_labels)
+            svg = diagram.build(**args) if render == "build" else ET.fromstring(diagram.draw(**args))
+            reactions = {group.get("name"): [text for text in group.findall("text") if text.get("class") != "stoich"]
+                         for group in svg.find("g[@id='eschermap']/g[@id='reactions']")}
+            metabolites = [group.findall("text") for group in svg.find("g[@id='eschermap']/g[@id='metabolites']")]
+            return reactions, metabolites
+
+        primary = [node["node_is_primary"] for node in map_json[1]["nodes"].values()
+                   if node["node_type"] == "metabolite"]
+        assert not all(primary)
+        reaction_ids = [reaction["bigg_id"] for reaction in map_json[1]["reactions"].values()]
+        reaction_data = {id_: 1.0 for id_ in reaction_ids[::2]}
+
+        # By default, every reaction and metabolite is labeled.
+        reactions, metabolites = labels(False, reaction_data=reaction_data)
+        assert all(len(texts) == 1 for texts in reactions.values())
+        assert all(len(texts) == 1 for texts in metabolites)
+
+        # Without reaction data, only secondary metabolite labels are hidden.
+        reactions, metabolites = labels(True)
+        assert all(len(texts) == 1 for texts in reactions.values())
+        assert [len(texts) for texts in metabolites] == [1 if is_primary else 0 for is_primary in primary]
+
+        # With reaction data, reactions without a value lose their labels as well.
+        reactions, metabolites = labels(True, reaction_data=reaction_data)
+        assert {id_: len(texts) for id_, texts in reactions.items()} == {
+            id_: 1 if id_ in reaction_data else 0 for id_ in reaction_ids}
+        assert [len(texts) for texts in metabolites] == [1 if is_primary else 0 for is_primary in primary]
@@ -41,7 +41,7 @@ class SimpleModel(Composer):
         }
 
 
-POOLS = {KB.get(KB.compounds, met_id): conc for met_id, conc in [
+CONCENTRATIONS = [
     ('accoa', 0.61),
     ('adp', 0.55),
     ('amp', 0.28),
@@ -54,20 +54,23 @@ POOLS = {KB.get(KB.compounds, met_id): conc for met_id, conc in [
     ('nad.red', 0.083),
     ('pi', 10.),  # no data
     ('Glc.D.ext', 10.0),  # environment
-]}
+]
+POOLS = dict(zip(KB.get_many(KB.compounds, [met_id for met_id, _ in CONCENTRATIONS]),
+                 [conc for _, conc in CONCENTRATIONS]))
 
 
 def build_config():
     glycolysis = KB.find(KB.pathways, 'glycolysis')[0]
-    reactions = glycolysis.steps + [KB.get(KB.reactions, 'pts.glc')]
+    pts, pfk, fbp, pyk, pps = KB.get_many(KB.reactions, ['pts.glc', 'pfk', 'fbp', 'pyk', 'pps'])
+    reactions = glycolysis.steps + [pts]
     acCoA = KB.get(KB.compounds, 'accoa')
 
     return {
         'fba_process': {
             'reactions': reactions,
             'futile_cycles': [
-                [KB.get(KB.reactions, 'pfk'), KB.get(KB.reactions, 'fbp')],
-                [KB.get(KB.reactions, 'pyk'), KB.get(KB.reactions, 'pps')],
+                [pfk, fbp],
+                [pyk, pps],
             ],
             'drivers': {
                 acCoA: POOLS[acCoA],
@@ -1,5 +1,6 @@
 from typing import Union
 
+import numpy as np
 from vivarium.core.process import Process
 from vivarium.core.types import State, Update
 
@@ -40,6 +41,15 @@ class FbaProcess(Process):
             objectives[f'futile-break-{i}'] = ExclusionObjective(self.network, cycle)
         self.fba = FbaGd(self.network, self.intermediates, objectives)
 
+        # Lookups used on every timestep, which never change over the life of the process.
+        self._driver_list = list(self.drivers)
+        self._driver_id_tuple = tuple(met.id for met in self.drivers)
+        self._driver_targets = np.array(list(self.drivers.values()), dtype=float)
+        self._boundary_index = np.array(
+            [i for i, met in enumerate(self.network.reactants) if met in self.boundaries], dtype=int)
+        self._boundary_id_list = [self.network.reactants[i].id for i in self._boundary_index]
+        self._reaction_id_list = [rxn.id for rxn in self.network.reactions]
+
     def ports_schema(self):
         return {
             'metabolomics_data': {},
@@ -56,37 +66,32 @@ class FbaProcess(Process):
         }
 
     def next_update(self, time_step: Union[float, int], states: State) -> Update:
-        # PID controller logic to calculate target production rates.
-        errors = {}
-        targets = {}
-        for met, target in self.drivers.items():
-            current = states['metabolites'][met.id]
-            error = target - current
-            delta = error - states['pid_data']['error'][met.id]
-            cum_error = states['pid_data']['cum_error'][met.id] + error
-
-            errors[met] = error
-            targets[met] = self.pid_kp * error + self.pid_ki * cum_error + self.pid_kd * delta
+        # PID controller logic to calculate target production rates, vectorized over all drivers.
+        n = len(self._driver_id_tuple)
+        metabolites = states['metabolites']
+        last_errors = states['pid_data']['error']
+        cum_errors = states['pid_data']['cum_error']
+        current = np.fromiter((metabolites[met_id] for met_id in self._driver_id_tuple), dtype=float, count=n)
+        error = self._driver_targets - current
+        delta = error - np.fromiter((last_errors[met_id] for met_id in self._driver_id_tuple), dtype=float, count=n)
+        cum_error = np.fromiter((cum_errors[met_id] for met_id in self._driver_id_tuple), dtype=float, count=n) + error
+        targets = self.pid_kp * error + self.pid_ki * cum_error + self.pid_kd * delta
+        error_list = error.tolist()
 
-        self.fba.update_params({'drivers': targets})
+        self.fba.update_params({'drivers': dict(zip(self._driver_list, targets.tolist()))})
 
         # Solve the problem and return updates
         soln = self.fba.solve()
 
         # Report rates of change for boundary metabolites, and flux for all reactions.
-        dmdts = {}
-        for met, dmdt in self.network.reactants.unpack(soln.dmdt).items():
-            if met in self.boundaries:
-                dmdts[met.id] = dmdt
-        velocities = {}
-        for rxn, velocity in self.network.reactions.unpack(soln.velocities).items():
-            velocities[rxn.id] = velocity
+        dmdts = dict(zip(self._boundary_id_list, soln.dmdt[self._boundary_index].tolist()))
+        velocities = dict(zip(self._reaction_id_list, soln.velocities.tolist()))
 
         return {
             'metabolites': dmdts,
             'fluxes': velocities,
             'pid_data': {
-                'error': {met.id: error for met, error in errors.items()},  # set
-                'cum_error': {met.id: error for met, error in errors.items()}  # accumulate
+                'error': dict(zip(self._driver_id_tuple, error_list)),  # set
+                'cum_error': dict(zip(self._driver_id_tuple, error_list)),  # accumulate
             }
         }